@@ -1,2 +1,2 @@
-from .configuration import get, set, load, save, restore_defaults
+from .configuration import get, set, load, save, restore_defaults, version
 from .names import *
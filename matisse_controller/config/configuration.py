@@ -1,10 +1,15 @@
-import copy
+import functools
 import json
+import operator
 from os import path
 
 import glom
 
 CONFIGURATION = {}
+# Incremented whenever the global configuration changes, so long-running loops know when to look up values again
+_version = 0
+# Maps dotted configuration names to the sequence of keys they represent, so each name is only split once
+_key_paths = {}
 DEFAULTS = {
     'matisse': {
         'device_id': 'USB0::0x17E7::0x0102::07-40-01::INSTR',
@@ -84,7 +89,9 @@ DEFAULTS = {
     'wavemeter': {
         'port': 'COM5',
         'precision': 3,
-        'measurement_delay': 0.5
+        'measurement_delay': 0.5,
+        'polling_interval': 0.02,
+        'max_reading_age': 1.0
     },
     'ple': {
         'target_temperature': -70,
@@ -99,21 +106,45 @@ DEFAULTS = {
 }
 
 
+def version() -> int:
+    """Return a number that changes whenever the global configuration is modified."""
+    return _version
+
+
 def get(name: str):
     """Fetch the global configuration value represented by the specified name."""
-    return glom.glom(CONFIGURATION, name)
+    keys = _key_paths.get(name)
+    if keys is None:
+        keys = _key_paths[name] = tuple(name.split('.'))
+    return functools.reduce(operator.getitem, keys, CONFIGURATION)
 
 
 def set(name: str, value):
     """Set the global configuration value represented by the specified name."""
+    global _version
     glom.assign(CONFIGURATION, name, value, missing=dict)
+    _version += 1
 
 
 def load(filename: str):
-    """Load configuration data from a file into the global configuration dictionary."""
+    """
+    Load configuration data from a file into the global configuration dictionary. Any options missing from the file,
+    such as those added since it was saved, are set to their defaults.
+    """
     with open(filename, 'r') as config_file:
-        global CONFIGURATION
+        global CONFIGURATION, _version
         CONFIGURATION = json.load(config_file)
+        _fill_missing(CONFIGURATION, DEFAULTS)
+        _version += 1
+
+
+def _fill_missing(config: dict, defaults: dict):
+    """Recursively copy into the given configuration dictionary any values from defaults that it doesn't have."""
+    for key, default in defaults.items():
+        if key not in config:
+            config[key] = json.loads(json.dumps(default))
+        elif isinstance(default, dict) and isinstance(config[key], dict):
+            _fill_missing(config[key], default)
 
 
 def save():
@@ -124,8 +155,10 @@ def save():
 
 def restore_defaults():
     """Overwrite the global configuration with the defaults, specified by configuration.DEFAULTS."""
-    global CONFIGURATION
-    CONFIGURATION = copy.deepcopy(DEFAULTS)
+    global CONFIGURATION, _version
+    # DEFAULTS only holds JSON-compatible values, so a JSON round-trip gives a deep copy without deepcopy's overhead
+    CONFIGURATION = json.loads(json.dumps(DEFAULTS))
+    _version += 1
 
 
 if path.exists('config.json'):
@@ -5,6 +5,8 @@ MATISSE_DEVICE_ID = 'matisse.device_id'
 WAVEMETER_PORT = 'wavemeter.port'
 WAVEMETER_PRECISION = 'wavemeter.precision'
 WAVEMETER_MEASUREMENT_DELAY = 'wavemeter.measurement_delay'
+WAVEMETER_POLLING_INTERVAL = 'wavemeter.polling_interval'
+WAVEMETER_MAX_READING_AGE = 'wavemeter.max_reading_age'
 
 STATUS_MONITOR_DELAY = 'gui.status_monitor.delay'
 STATUS_MONITOR_FONT_SIZE = 'gui.status_monitor.font_size'
@@ -2,6 +2,8 @@ MATISSE_DEVICE_ID = 'An NI-VISA instrument descriptor for the Matisse.'
 WAVEMETER_PORT = 'The serial port to use for reading from the wavemeter.'
 WAVEMETER_PRECISION = 'Precision of the readings from the wavemeter. 1 -> 0.1, 2 -> 0.01, 3 -> 0.001, etc.'
 WAVEMETER_MEASUREMENT_DELAY = 'The delay, in seconds, to wait before reading a measurement from the wavemeter during a scan.'
+WAVEMETER_POLLING_INTERVAL = 'The delay, in seconds, between measurements taken by the wavemeter in the background. Takes effect after restarting.'
+WAVEMETER_MAX_READING_AGE = 'The age, in seconds, past which a wavemeter measurement is too old to use. Older readings wait for a new measurement.'
 
 STATUS_MONITOR_DELAY = 'The delay, in seconds, between each update of the status monitor at the bottom of the window.'
 STATUS_MONITOR_FONT_SIZE = 'The font size of the status monitor at the bottom of the window.'
@@ -55,6 +55,15 @@ class ConfigurationDialog(QDialog):
         self.wavemeter_measurement_delay_field.setMinimum(0)
         self.wavemeter_measurement_delay_field.setSingleStep(0.1)
         general_layout.addRow('Wavemeter measurement delay: ', self.wavemeter_measurement_delay_field)
+        self.wavemeter_polling_interval_field = QDoubleSpinBox()
+        self.wavemeter_polling_interval_field.setMinimum(0.01)
+        self.wavemeter_polling_interval_field.setDecimals(3)
+        self.wavemeter_polling_interval_field.setSingleStep(0.01)
+        general_layout.addRow('Wavemeter polling interval: ', self.wavemeter_polling_interval_field)
+        self.wavemeter_max_reading_age_field = QDoubleSpinBox()
+        self.wavemeter_max_reading_age_field.setMinimum(0.1)
+        self.wavemeter_max_reading_age_field.setSingleStep(0.1)
+        general_layout.addRow('Wavemeter max reading age: ', self.wavemeter_max_reading_age_field)
         self.component_limit_offset_field = QDoubleSpinBox()
         self.component_limit_offset_field.setMinimum(0)
         self.component_limit_offset_field.setDecimals(3)
@@ -273,6 +282,8 @@ class ConfigurationDialog(QDialog):
         self.wavemeter_port_field.setToolTip(tooltips.WAVEMETER_PORT)
         self.wavemeter_precision_field.setToolTip(tooltips.WAVEMETER_PRECISION)
         self.wavemeter_measurement_delay_field.setToolTip(tooltips.WAVEMETER_MEASUREMENT_DELAY)
+        self.wavemeter_polling_interval_field.setToolTip(tooltips.WAVEMETER_POLLING_INTERVAL)
+        self.wavemeter_max_reading_age_field.setToolTip(tooltips.WAVEMETER_MAX_READING_AGE)
 
         self.status_monitor_delay_field.setToolTip(tooltips.STATUS_MONITOR_DELAY)
         self.status_monitor_font_size_field.setToolTip(tooltips.STATUS_MONITOR_FONT_SIZE)
@@ -334,6 +345,8 @@ class ConfigurationDialog(QDialog):
         self.wavemeter_port_field.setText(cfg.get(cfg.WAVEMETER_PORT))
         self.wavemeter_precision_field.setValue(cfg.get(cfg.WAVEMETER_PRECISION))
         self.wavemeter_measurement_delay_field.setValue(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
+        self.wavemeter_polling_interval_field.setValue(cfg.get(cfg.WAVEMETER_POLLING_INTERVAL))
+        self.wavemeter_max_reading_age_field.setValue(cfg.get(cfg.WAVEMETER_MAX_READING_AGE))
 
         self.status_monitor_delay_field.setValue(cfg.get(cfg.STATUS_MONITOR_DELAY))
         self.status_monitor_font_size_field.setValue(cfg.get(cfg.STATUS_MONITOR_FONT_SIZE))
@@ -418,6 +431,8 @@ class ConfigurationDialog(QDialog):
         cfg.set(cfg.WAVEMETER_PORT, self.wavemeter_port_field.text())
         cfg.set(cfg.WAVEMETER_PRECISION, self.wavemeter_precision_field.value())
         cfg.set(cfg.WAVEMETER_MEASUREMENT_DELAY, self.wavemeter_measurement_delay_field.value())
+        cfg.set(cfg.WAVEMETER_POLLING_INTERVAL, self.wavemeter_polling_interval_field.value())
+        cfg.set(cfg.WAVEMETER_MAX_READING_AGE, self.wavemeter_max_reading_age_field.value())
 
         cfg.set(cfg.STATUS_MONITOR_DELAY, self.status_monitor_delay_field.value())
         cfg.set(cfg.STATUS_MONITOR_FONT_SIZE, self.status_monitor_font_size_field.value())
@@ -79,7 +79,7 @@ class PLEAnalysisDialog(QDialog):
     @pyqtSlot(bool)
     def select_data_file(self, checked):
         self.data_file_path = QFileDialog.getOpenFileName(caption='Select Data File',
-                                                          filter='Pickled Data (*.pickle)')[0]
+                                                          filter='PLE Data (*.json *.pickle)')[0]
         self.data_file_label.setText(os.path.basename(self.data_file_path))
 
     @pyqtSlot(bool)
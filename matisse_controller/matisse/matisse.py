@@ -4,7 +4,7 @@ import time
 
 import numpy as np
 from pyvisa import ResourceManager, VisaIOError
-from scipy.signal import savgol_filter, argrelextrema
+from scipy.signal import savgol_filter, find_peaks
 
 import matisse_controller.config as cfg
 from matisse_controller.matisse.constants import *
@@ -13,7 +13,18 @@ from matisse_controller.matisse.event_report import log_event, EventType
 from matisse_controller.matisse.lock_correction_thread import LockCorrectionThread
 from matisse_controller.matisse.plotting import BirefringentFilterScanPlotProcess, ThinEtalonScanPlotProcess
 from matisse_controller.matisse.stabilization_thread import StabilizationThread
-from matisse_controller.wavemaster import WaveMaster
+from matisse_controller.wavemaster import WaveMaster, WaveMasterPollingThread
+
+
+_resource_manager: ResourceManager = None
+
+
+def _get_resource_manager() -> ResourceManager:
+    """Return the VISA resource manager shared by this process, creating it the first time it's needed."""
+    global _resource_manager
+    if _resource_manager is None:
+        _resource_manager = ResourceManager()
+    return _resource_manager
 
 
 class Matisse:
@@ -22,7 +33,12 @@ class Matisse:
     def __init__(self):
         try:
             # Initialize VISA resource manager, connect to Matisse and wavemeter, clear any errors.
-            self._instrument = ResourceManager().open_resource(cfg.get(cfg.MATISSE_DEVICE_ID))
+            self._instrument = _get_resource_manager().open_resource(cfg.get(cfg.MATISSE_DEVICE_ID))
+            # Explicit terminators let each query return as soon as the response arrives, rather than on a timeout
+            self._instrument.read_termination = '\n'
+            self._instrument.write_termination = '\n'
+            self._instrument.send_end = True
+            self._instrument.timeout = 3000
             self.target_wavelength = None
             self._stabilization_thread = None
             self._lock_correction_thread = None
@@ -35,21 +51,32 @@ class Matisse:
             self.is_scanning_bifi = False
             self.is_scanning_thin_etalon = False
             self.stabilization_auto_corrections = 0
+            self._bifi_pos_to_wavelength = {}
             self.query('ERROR:CLEAR')  # start with a clean slate
             self.query('MOTORBIREFRINGENT:CLEAR')
             self.query('MOTORTHINETALON:CLEAR')
             self._wavemeter = WaveMaster(cfg.get(cfg.WAVEMETER_PORT))
+            # Keep a recent wavelength measurement on hand so callers don't have to wait on the serial port
+            self._wavemeter_polling_thread = WaveMasterPollingThread(self._wavemeter,
+                                                                     cfg.get(cfg.WAVEMETER_POLLING_INTERVAL),
+                                                                     daemon=True)
+            self._wavemeter_polling_thread.start()
         except VisaIOError as ioerr:
             raise IOError("Can't reach Matisse. Make sure it's on and connected via USB.") from ioerr
 
     def __del__(self):
+        try:
+            self._wavemeter_polling_thread.exit_event.set()
+        except AttributeError:
+            # No wavemeter polling thread to stop
+            pass
         try:
             self._instrument.close()
         except AttributeError:
             # No instrument to close
             pass
 
-    def query(self, command: str, numeric_result=False, raise_on_error=True):
+    def query(self, command: str, numeric_result=False, int_result=False, raise_on_error=True):
         """
         Send a command to the Matisse and return the response.
 
@@ -66,12 +93,14 @@ class Matisse:
             the command to send
         numeric_result : bool
             whether to convert the second portion of the result to a float
+        int_result : bool
+            whether to convert the second portion of the result to an int, for registers like motor statuses
         raise_on_error : bool
             whether to raise a Python error if Matisse error occurs
 
         Returns
         -------
-        str or float
+        str or float or int
             The response from the Matisse to the given command
         """
         try:
@@ -82,21 +111,62 @@ class Matisse:
 
         if result.startswith('!ERROR'):
             if raise_on_error:
-                err_codes = self.query('ERROR:CODE?')
-                self.query('ERROR:CLEAR')
-                raise RuntimeError("Error executing Matisse command '" + command + "' " + err_codes)
+                self._raise_matisse_error(command)
+        elif int_result:
+            result: int = int(result.split()[1])
         elif numeric_result:
             result: float = float(result.split()[1])
         return result
 
-    def wavemeter_wavelength(self) -> float:
+    def query_compound(self, *commands: str, raise_on_error=True) -> list:
+        """
+        Send several commands to the Matisse in a single transaction and return each of their responses.
+
+        The commands are chained together, so this costs only one round-trip over the connection to the Matisse rather
+        than one per command. The same caveats as `Matisse.query` apply to each individual command.
+
+        Parameters
+        ----------
+        *commands : str
+            the commands to send, in order
+        raise_on_error : bool
+            whether to raise a Python error if a Matisse error occurs for any of the commands
+
+        Returns
+        -------
+        list of str
+            the response from the Matisse to each of the given commands
+        """
+        results = [result.strip() for result in self.query(';:'.join(commands), raise_on_error=False).split(';')]
+        if raise_on_error and any(result.startswith('!ERROR') for result in results):
+            self._raise_matisse_error(';:'.join(commands))
+        return results
+
+    def _raise_matisse_error(self, command: str):
+        """Fetch and clear the Matisse error codes in a single transaction, then raise them as a Python error."""
+        err_codes = self.query_compound('ERROR:CODE?', 'ERROR:CLEAR', raise_on_error=False)[0]
+        raise RuntimeError("Error executing Matisse command '" + command + "' " + err_codes)
+
+    def wavemeter_wavelength(self, newer_than: float = None) -> float:
         """
+        Parameters
+        ----------
+        newer_than : float
+            if given, a `time.monotonic()` timestamp that the measurement must have started after, such as the time at
+            which a motor settled after moving
+
         Returns
         -------
         float
-            the wavelength (in nanometers) as measured by the wavemeter
+            the wavelength (in nanometers) as most recently measured by the wavemeter. If that measurement is older than
+            the configured maximum reading age, or started before `newer_than`, wait for a new one.
+
+        Raises
+        ------
+        IOError
+            if the most recent attempt to measure the wavelength failed
         """
-        return self._wavemeter.get_wavelength()
+        return self._wavemeter_polling_thread.get_wavelength(cfg.get(cfg.WAVEMETER_MAX_READING_AGE), newer_than)
 
     def wavemeter_raw_value(self) -> str:
         """
@@ -181,7 +251,7 @@ class Matisse:
                 print(f"Setting BiFi to ~{wavelength} nm... ")
                 self.set_bifi_wavelength(wavelength)
                 time.sleep(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
-                print(f"Done. Wavelength is now {self.wavemeter_wavelength()} nm. "
+                print(f"Done. Wavelength is now {self.wavemeter_wavelength(newer_than=time.monotonic())} nm. "
                       "(This is often very wrong, don't worry)")
                 self.birefringent_filter_scan(repeat=True)
                 self.thin_etalon_scan(repeat=True)
@@ -248,6 +318,7 @@ class Matisse:
         """Move the birefringent filter and thin etalon motors to their configured reset positions."""
         self.query(f"MOTBI:POS {cfg.get(cfg.BIFI_RESET_POS)}")
         self.query(f"MOTTE:POS {cfg.get(cfg.THIN_ETA_RESET_POS)}")
+        self._bifi_pos_to_wavelength.clear()  # wavelengths measured at the old thin etalon position no longer apply
 
     def close_all_plots(self):
         """Close all plot windows."""
@@ -289,12 +360,20 @@ class Matisse:
                 and 0 < upper_end < BIREFRINGENT_FILTER_UPPER_LIMIT
                 and lower_end < upper_end), 'Conditions for BiFi scan invalid. Motor position must be between ' + \
                                             f"{scan_range} and {BIREFRINGENT_FILTER_UPPER_LIMIT - scan_range}"
-        positions = np.array(range(lower_end, upper_end, cfg.get(cfg.BIFI_SCAN_STEP)))
-        voltages = np.array([])
+        positions = np.arange(lower_end, upper_end, cfg.get(cfg.BIFI_SCAN_STEP), dtype=np.int64)
+        voltages = np.empty(positions.size)
         print('Starting BiFi scan... ')
-        for pos in positions:
-            self.set_bifi_motor_pos(pos)
-            voltages = np.append(voltages, self.query('DPOW:DC?', numeric_result=True))
+        self.set_bifi_motor_pos(positions[0])
+        query_compound, wait_motor_idle = self.query_compound, self._wait_motor_idle
+        motor_status = self.bifi_motor_status
+        num_positions = positions.size
+        for i in range(num_positions):
+            # Read the power at this position and start moving to the next one in the same transaction
+            commands = ['DPOW:DC?']
+            if i + 1 < num_positions:
+                commands.append(f"MOTBI:POS {positions[i + 1]}")
+            voltages[i] = float(query_compound(*commands)[0].split()[1])
+            wait_motor_idle(motor_status)
         self.set_bifi_motor_pos(old_pos)  # return back to where we started, just in case something goes wrong
         print('Done.')
 
@@ -302,15 +381,43 @@ class Matisse:
         # Smooth out the data and find extrema
         smoothed_data = savgol_filter(voltages, window_length=cfg.get(cfg.BIFI_SMOOTHING_FILTER_WINDOW),
                                       polyorder=cfg.get(cfg.BIFI_SMOOTHING_FILTER_POLYORDER))
-        maxima = argrelextrema(smoothed_data, np.greater, order=5)
+        noise_estimate = np.std(voltages - smoothed_data)
+        maxima, _ = find_peaks(smoothed_data, distance=5, prominence=noise_estimate)
 
         # Find the position of the extremum closest to the target wavelength
-        wavelength_differences = np.array([])
-        for pos in positions[maxima]:
-            self.set_bifi_motor_pos(pos)
+        predicted_wavelengths = self._predict_bifi_wavelengths(positions[maxima])
+        slope = self._bifi_wavelength_slope()
+        if predicted_wavelengths is None and slope is not None and positions[maxima].size > 1:
+            # Measure only the middle maximum, and extrapolate to the others using the slope of earlier measurements
+            reference_pos = positions[maxima][positions[maxima].size // 2]
+            self.set_bifi_motor_pos(reference_pos)
+            time.sleep(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
+            reference_wavelength = self.wavemeter_wavelength(newer_than=time.monotonic())
+            self._bifi_pos_to_wavelength[int(reference_pos)] = reference_wavelength
+            predicted_wavelengths = reference_wavelength + slope * (positions[maxima] - reference_pos)
+        if predicted_wavelengths is None:
+            wavelength_differences = self._measure_bifi_maxima(positions[maxima])
+            new_diff = np.min(wavelength_differences)
+        else:
+            print('Using previously measured BiFi positions to estimate wavelengths at each maximum.')
+            wavelength_differences = np.abs(predicted_wavelengths - self.target_wavelength)
+            # Check the estimate at the chosen maximum against the wavemeter before relying on it
+            best_index = np.argmin(wavelength_differences)
+            best_pos = positions[maxima][best_index]
+            self.set_bifi_motor_pos(best_pos)
             time.sleep(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
-            wavelength_differences = np.append(wavelength_differences,
-                                               abs(self.wavemeter_wavelength() - self.target_wavelength))
+            wavelength = self.wavemeter_wavelength(newer_than=time.monotonic())
+            if abs(wavelength - predicted_wavelengths[best_index]) > cfg.get(cfg.MEDIUM_WAVELENGTH_DRIFT):
+                # The earlier measurements no longer describe the laser (e.g. the thin etalon has moved since), so
+                # forget them and measure every maximum instead
+                print('BiFi wavelength estimate was off, measuring each maximum instead.')
+                self._bifi_pos_to_wavelength.clear()
+                wavelength_differences = self._measure_bifi_maxima(positions[maxima])
+                new_diff = np.min(wavelength_differences)
+            else:
+                # Keep the measurement, so the next estimate can be a little better
+                self._bifi_pos_to_wavelength[int(best_pos)] = wavelength
+                new_diff = abs(wavelength - self.target_wavelength)
         best_pos = positions[maxima][np.argmin(wavelength_differences)]
 
         # By default, let's assume we're using the new position.
@@ -337,11 +444,72 @@ class Matisse:
             plot_process.start()
 
         if repeat:
-            new_diff = np.min(wavelength_differences)
             if abs(new_diff) > cfg.get(cfg.MEDIUM_WAVELENGTH_DRIFT):
                 print('Wavelength still too far away from target value. Starting another scan.')
                 self.birefringent_filter_scan(scan_range, repeat=True)
 
+    def _measure_bifi_maxima(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Move the birefringent filter motor to each of the given positions and measure the wavelength there, keeping the
+        measurements for estimating wavelengths in later scans.
+
+        Parameters
+        ----------
+        positions : ndarray
+            the motor positions at which to measure the wavelength
+
+        Returns
+        -------
+        ndarray
+            the difference between the wavelength at each position and the target wavelength
+        """
+        wavelength_differences = np.empty(positions.size)
+        for i, pos in enumerate(positions):
+            self.set_bifi_motor_pos(pos)
+            time.sleep(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
+            wavelength = self.wavemeter_wavelength(newer_than=time.monotonic())
+            self._bifi_pos_to_wavelength[int(pos)] = wavelength
+            wavelength_differences[i] = abs(wavelength - self.target_wavelength)
+        return wavelength_differences
+
+    def _predict_bifi_wavelengths(self, positions: np.ndarray):
+        """
+        Estimate the wavelength at each of the given birefringent filter motor positions by interpolating between the
+        wavelengths measured at nearby positions during previous scans.
+
+        Parameters
+        ----------
+        positions : ndarray
+            the motor positions at which to estimate the wavelength
+
+        Returns
+        -------
+        ndarray or None
+            the estimated wavelength at each position, or None if any position lies outside the range of positions
+            measured so far
+        """
+        if len(self._bifi_pos_to_wavelength) < 2 or positions.size == 0:
+            return None
+        known_positions = np.array(sorted(self._bifi_pos_to_wavelength))
+        if positions.min() < known_positions[0] or positions.max() > known_positions[-1]:
+            return None
+        known_wavelengths = np.array([self._bifi_pos_to_wavelength[pos] for pos in known_positions])
+        return np.interp(positions, known_positions, known_wavelengths)
+
+    def _bifi_wavelength_slope(self):
+        """
+        Returns
+        -------
+        float or None
+            the change in wavelength per birefringent filter motor step, from a linear fit of the wavelengths measured
+            during previous scans, or None if not enough distinct positions have been measured yet
+        """
+        if len(self._bifi_pos_to_wavelength) < 2:
+            return None
+        known_positions = np.fromiter(self._bifi_pos_to_wavelength.keys(), dtype=float)
+        known_wavelengths = np.fromiter(self._bifi_pos_to_wavelength.values(), dtype=float)
+        return np.polyfit(known_positions, known_wavelengths, 1)[0]
+
     def set_bifi_motor_pos(self, pos: int):
         """
         Set the birefringent filter motor to the selected position. This method will block the calling thread until the
@@ -354,12 +522,10 @@ class Matisse:
         """
         assert 0 < pos < BIREFRINGENT_FILTER_UPPER_LIMIT, 'Target motor position out of range.'
         # Wait for motor to be ready to accept commands
-        while not self.bifi_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.bifi_motor_status)
         self.query(f"MOTBI:POS {pos}")
         # Wait for motor to finish movement
-        while not self.bifi_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.bifi_motor_status)
 
     def set_bifi_wavelength(self, value: float):
         """
@@ -374,12 +540,33 @@ class Matisse:
         assert cfg.get(cfg.WAVELENGTH_LOWER_LIMIT) < value < cfg.get(cfg.WAVELENGTH_UPPER_LIMIT), \
             'Target wavelength out of range.'
         # Wait for motor to be ready to accept commands
-        while not self.bifi_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.bifi_motor_status)
         self.query(f"MOTBI:WAVELENGTH {value}")
         # Wait for motor to finish movement
-        while not self.bifi_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.bifi_motor_status)
+
+    def _wait_motor_idle(self, status_fn, timeout=30.0):
+        """
+        Block the calling thread until a motor reports an idle status.
+
+        The motor status is polled quickly at first, then less often, so that short movements return promptly without
+        flooding the connection to the Matisse with status queries during long movements.
+
+        Parameters
+        ----------
+        status_fn
+            a function returning the motor status, like `Matisse.bifi_motor_status`
+        timeout : float
+            the maximum number of seconds to wait for the motor
+        """
+        idle, monotonic, sleep = MOTOR_STATUS_IDLE, time.monotonic, time.sleep
+        deadline = monotonic() + timeout
+        delay = 0.001
+        while not status_fn() == idle:
+            if monotonic() > deadline:
+                raise RuntimeError(f"Timed out after {timeout} s waiting for motor to become idle.")
+            sleep(delay)
+            delay = min(delay * 1.5, 0.1)
 
     def bifi_motor_status(self):
         """
@@ -388,7 +575,7 @@ class Matisse:
         int
             the last 8 bits of the birefringent filter motor status
         """
-        return int(self.query('MOTBI:STATUS?', numeric_result=True)) & 0b000000011111111
+        return self.query('MOTBI:STATUS?', int_result=True) & 0xFF
 
     def thin_etalon_scan(self, scan_range: int = None, repeat=False):
         """
@@ -428,12 +615,20 @@ class Matisse:
         old_pos = int(self.query('MOTTE:POS?', numeric_result=True))
         lower_end, upper_end = self.limits_for_thin_etalon_scan(old_pos, scan_range)
 
-        positions = np.array(range(lower_end, upper_end, cfg.get(cfg.THIN_ETA_SCAN_STEP)))
-        voltages = np.array([])
+        positions = np.arange(lower_end, upper_end, cfg.get(cfg.THIN_ETA_SCAN_STEP), dtype=np.int64)
+        voltages = np.empty(positions.size)
         print('Starting thin etalon scan... ')
-        for pos in positions:
-            self.set_thin_etalon_motor_pos(pos)
-            voltages = np.append(voltages, self.query('TE:DC?', numeric_result=True))
+        self.set_thin_etalon_motor_pos(positions[0])
+        query_compound, wait_motor_idle = self.query_compound, self._wait_motor_idle
+        motor_status = self.thin_etalon_motor_status
+        num_positions = positions.size
+        for i in range(num_positions):
+            # Read the reflex at this position and start moving to the next one in the same transaction
+            commands = ['TE:DC?']
+            if i + 1 < num_positions:
+                commands.append(f"MOTTE:POS {positions[i + 1]}")
+            voltages[i] = float(query_compound(*commands)[0].split()[1])
+            wait_motor_idle(motor_status)
         self.set_thin_etalon_motor_pos(old_pos)  # return back to where we started, just in case something goes wrong
         print('Done.')
 
@@ -452,15 +647,16 @@ class Matisse:
             self.is_scanning_thin_etalon = False
             return
 
-        minima = argrelextrema(smoothed_data, np.less, order=5)
+        noise_estimate = np.std(voltages - smoothed_data)
+        minima, _ = find_peaks(-smoothed_data, distance=5, prominence=noise_estimate)
 
         # Find the position of the extremum closest to the target wavelength
-        wavelength_differences = np.array([])
-        for pos in positions[minima]:
+        wavelength_differences = np.empty(positions[minima].size)
+        for i, pos in enumerate(positions[minima]):
             self.set_thin_etalon_motor_pos(pos)
             time.sleep(cfg.get(cfg.WAVEMETER_MEASUREMENT_DELAY))
-            wavelength_differences = np.append(wavelength_differences,
-                                               abs(self.wavemeter_wavelength() - self.target_wavelength))
+            wavelength = self.wavemeter_wavelength(newer_than=time.monotonic())
+            wavelength_differences[i] = abs(wavelength - self.target_wavelength)
         best_minimum_index = np.argmin(wavelength_differences)
         best_pos = positions[minima][best_minimum_index] + cfg.get(cfg.THIN_ETA_NUDGE)
 
@@ -551,12 +747,10 @@ class Matisse:
         assert (THIN_ETALON_LOWER_LIMIT < pos < THIN_ETALON_UPPER_LIMIT), \
             f"Can't set thin etalon motor position to {pos}, this is out of range."
         # Wait for motor to be ready to accept commands
-        while not self.thin_etalon_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.thin_etalon_motor_status)
         self.query(f"MOTTE:POS {pos}")
         # Wait for motor to finish movement
-        while not self.thin_etalon_motor_status() == MOTOR_STATUS_IDLE:
-            pass
+        self._wait_motor_idle(self.thin_etalon_motor_status)
 
     def thin_etalon_motor_status(self):
         """
@@ -565,7 +759,7 @@ class Matisse:
         int
             the last 8 bits of the thin etalon motor status
         """
-        return int(self.query('MOTTE:STATUS?', numeric_result=True)) & 0b000000011111111
+        return self.query('MOTTE:STATUS?', int_result=True) & 0xFF
 
     def set_slow_piezo_control(self, enable: bool):
         """Set the status of the control loop for the slow piezo."""
@@ -590,10 +784,9 @@ class Matisse:
         bool
             whether the slow piezo, thin etalon, piezo etalon, and fast piezo all have their control loops enabled
         """
-        return ('RUN' in self.query('SLOWPIEZO:CONTROLSTATUS?')
-                and 'RUN' in self.query('THINETALON:CONTROLSTATUS?')
-                and 'RUN' in self.query('PIEZOETALON:CONTROLSTATUS?')
-                and 'RUN' in self.query('FASTPIEZO:CONTROLSTATUS?'))
+        statuses = self.query_compound('SLOWPIEZO:CONTROLSTATUS?', 'THINETALON:CONTROLSTATUS?',
+                                       'PIEZOETALON:CONTROLSTATUS?', 'FASTPIEZO:CONTROLSTATUS?')
+        return all('RUN' in status for status in statuses)
 
     def fast_piezo_locked(self):
         """
@@ -625,7 +818,7 @@ class Matisse:
         if self.is_stabilizing():
             print('WARNING: Already stabilizing laser. Call stabilize_off before trying to stabilize again.')
         else:
-            self._stabilization_thread = StabilizationThread(self, queue.Queue(), daemon=True)
+            self._stabilization_thread = StabilizationThread(self, daemon=True)
 
             if self.target_wavelength is None:
                 self.target_wavelength = self.wavemeter_wavelength()
@@ -636,7 +829,7 @@ class Matisse:
         """Exit the stabilization loop, which stops the stabilization thread."""
         if self.is_stabilizing():
             print('Stopping stabilization thread.')
-            self._stabilization_thread.messages.put('stop')
+            self._stabilization_thread.exit_event.set()
             self._stabilization_thread.join()
             print('Stabilization thread has been stopped.')
         else:
@@ -677,6 +870,15 @@ class Matisse:
         """
         return self._stabilization_thread is not None and self._stabilization_thread.is_alive()
 
+    def is_tuning(self):
+        """
+        Returns
+        -------
+        bool
+            whether the wavelength is being set, or the birefringent filter or thin etalon is being scanned
+        """
+        return self.is_setting_wavelength or self.is_scanning_bifi or self.is_scanning_thin_etalon
+
     def get_stabilizing_piezo_positions(self):
         """
         Returns
@@ -684,9 +886,8 @@ class Matisse:
         (float, float, float)
             the current positions of the "stabilization piezos": RefCell, piezo etalon, and slow piezo
         """
-        current_refcell_pos = self.query('SCAN:NOW?', numeric_result=True)
-        current_slow_pz_pos = self.query('SLOWPIEZO:NOW?', numeric_result=True)
-        current_pz_eta_pos = self.query('PIEZOETALON:BASELINE?', numeric_result=True)
+        results = self.query_compound('SCAN:NOW?', 'SLOWPIEZO:NOW?', 'PIEZOETALON:BASELINE?')
+        current_refcell_pos, current_slow_pz_pos, current_pz_eta_pos = (float(result.split()[1]) for result in results)
         return current_refcell_pos, current_pz_eta_pos, current_slow_pz_pos
 
     def is_any_limit_reached(self):
@@ -720,17 +921,18 @@ class Matisse:
         offset = cfg.get(cfg.COMPONENT_LIMIT_OFFSET)
         if (current_refcell_pos > REFERENCE_CELL_UPPER_LIMIT - offset
                 and current_wavelength < self.target_wavelength):
-            self.query(f"SCAN:NOW {cfg.get(cfg.REFCELL_LOWER_CORRECTION_POS)}")
-            self.query(f"PIEZOETALON:BASELINE {cfg.get(cfg.PIEZO_ETA_UPPER_CORRECTION_POS)}")
+            refcell_pos = cfg.get(cfg.REFCELL_LOWER_CORRECTION_POS)
+            pz_eta_pos = cfg.get(cfg.PIEZO_ETA_UPPER_CORRECTION_POS)
         elif (current_refcell_pos < REFERENCE_CELL_LOWER_LIMIT + offset
               and current_wavelength > self.target_wavelength):
-            self.query(f"SCAN:NOW {cfg.get(cfg.REFCELL_UPPER_CORRECTION_POS)}")
-            self.query(f"PIEZOETALON:BASELINE {cfg.get(cfg.PIEZO_ETA_LOWER_CORRECTION_POS)}")
+            refcell_pos = cfg.get(cfg.REFCELL_UPPER_CORRECTION_POS)
+            pz_eta_pos = cfg.get(cfg.PIEZO_ETA_LOWER_CORRECTION_POS)
         else:
-            self.query(f"SCAN:NOW {cfg.get(cfg.REFCELL_MID_CORRECTION_POS)}")
-            self.query(f"PIEZOETALON:BASELINE {cfg.get(cfg.PIEZO_ETA_MID_CORRECTION_POS)}")
+            refcell_pos = cfg.get(cfg.REFCELL_MID_CORRECTION_POS)
+            pz_eta_pos = cfg.get(cfg.PIEZO_ETA_MID_CORRECTION_POS)
 
-        self.query(f"SLOWPIEZO:NOW {cfg.get(cfg.SLOW_PIEZO_MID_CORRECTION_POS)}")
+        self.query_compound(f"SCAN:NOW {refcell_pos}", f"PIEZOETALON:BASELINE {pz_eta_pos}",
+                            f"SLOWPIEZO:NOW {cfg.get(cfg.SLOW_PIEZO_MID_CORRECTION_POS)}")
 
     def get_reference_cell_transmission_spectrum(self):
         """
@@ -746,11 +948,11 @@ class Matisse:
         positions = np.linspace(cfg.get(cfg.FAST_PZ_SETPOINT_SCAN_LOWER_LIMIT),
                                 cfg.get(cfg.FAST_PZ_SETPOINT_SCAN_UPPER_LIMIT),
                                 cfg.get(cfg.FAST_PZ_SETPOINT_NUM_POINTS))
-        values = np.array([])
+        values = np.empty(positions.size)
         old_refcell_pos = self.query(f"SCAN:NOW?", numeric_result=True)
-        for pos in positions:
+        for i, pos in enumerate(positions):
             self.query(f"SCAN:NOW {pos}")
-            values = np.append(values, self.query('FASTPIEZO:INPUT?', numeric_result=True))
+            values[i] = self.query('FASTPIEZO:INPUT?', numeric_result=True)
         self.query(f"SCAN:NOW {old_refcell_pos}")
 
         return positions, values
@@ -1,6 +1,4 @@
 import threading
-import time
-from queue import Queue
 
 import matisse_controller.config as cfg
 import matisse_controller.matisse as matisse
@@ -8,13 +6,11 @@ from matisse_controller.matisse.event_report import log_event, EventType
 
 
 class StabilizationThread(threading.Thread):
-    def __init__(self, matisse, messages: Queue, *args, **kwargs):
+    def __init__(self, matisse, *args, **kwargs):
         """
         Parameters
         ----------
         matisse : matisse_controller.matisse.matisse.Matisse
-        messages
-            a message queue
         *args
             args to pass to `Thread.__init__`
         **kwargs
@@ -22,7 +18,7 @@ class StabilizationThread(threading.Thread):
         """
         super().__init__(*args, **kwargs)
         self._matisse = matisse
-        self.messages = messages
+        self.exit_event = threading.Event()
         # Stop any running scans just in case
         self._matisse.stop_scan()
         self._matisse.query(f"SCAN:RISINGSPEED {cfg.get(cfg.STABILIZATION_RISING_SPEED)}")
@@ -35,51 +31,58 @@ class StabilizationThread(threading.Thread):
         If a larger drift in wavelength occurs, we might have fallen into a dip on the power diode curve. To correct
         this, a small BiFi scan and a small thin etalon scan will be performed.
 
-        Exit if anything is pushed to the message queue.
+        Exit as soon as `exit_event` is set, without waiting for the rest of the stabilization delay.
         """
-        while True:
-            if self.messages.qsize() == 0:
-                current_wavelength = self._matisse.wavemeter_wavelength()
-                drift = round(current_wavelength - self._matisse.target_wavelength, cfg.get(cfg.WAVEMETER_PRECISION))
-                # TODO: This threshold is large, maybe add another config option for this condition
-                if abs(drift) > cfg.get(cfg.LARGE_WAVELENGTH_DRIFT):
-                    # TODO: Consider logging this event to the event report
-                    print(f"WARNING: Wavelength drifted by {drift} nm during stabilization. Making corrections.")
-                    self._matisse.stop_scan()
-                    if self._matisse.is_lock_correction_on():
-                        self._matisse.stop_laser_lock_correction()
-                    # TODO: Skip BiFi scan if drift is small enough, kind of like in Matisse.set_wavelength
-                    self._matisse.birefringent_filter_scan(scan_range=cfg.get(cfg.BIFI_SCAN_RANGE_SMALL))
-                    self._matisse.thin_etalon_scan(scan_range=cfg.get(cfg.THIN_ETA_SCAN_RANGE_SMALL))
-                    self._matisse.start_laser_lock_correction()
-                elif abs(drift) > cfg.get(cfg.STABILIZATION_TOLERANCE):
-                    if drift > 0:
-                        # measured wavelength is too high
-                        print(f"Wavelength too high, decreasing. Drift is {drift} nm. Refcell is at {self._matisse.query('SCAN:NOW?', numeric_result=True)}")
-                        if not self._matisse.is_any_limit_reached():
-                            if cfg.get(cfg.REPORT_EVENTS):
-                                log_event(EventType.WAVELENGTH_DRIFT, self._matisse, current_wavelength,
-                                          f"wavelength drifted by {drift} nm")
-                            self._matisse.start_scan(matisse.SCAN_MODE_DOWN)
-                        else:
-                            self.do_stabilization_correction(current_wavelength)
+        config_version = None
+        while not self.exit_event.is_set():
+            # Only look up configuration values again if they might have changed since the last iteration
+            if config_version != cfg.version():
+                config_version = cfg.version()
+                precision = cfg.get(cfg.WAVEMETER_PRECISION)
+                large_drift = cfg.get(cfg.LARGE_WAVELENGTH_DRIFT)
+                tolerance = cfg.get(cfg.STABILIZATION_TOLERANCE)
+                report_events = cfg.get(cfg.REPORT_EVENTS)
+                delay = cfg.get(cfg.STABILIZATION_DELAY)
+
+            current_wavelength = self._matisse.wavemeter_wavelength()
+            drift = round(current_wavelength - self._matisse.target_wavelength, precision)
+            # TODO: This threshold is large, maybe add another config option for this condition
+            if abs(drift) > large_drift:
+                # TODO: Consider logging this event to the event report
+                print(f"WARNING: Wavelength drifted by {drift} nm during stabilization. Making corrections.")
+                self._matisse.stop_scan()
+                if self._matisse.is_lock_correction_on():
+                    self._matisse.stop_laser_lock_correction()
+                # TODO: Skip BiFi scan if drift is small enough, kind of like in Matisse.set_wavelength
+                self._matisse.birefringent_filter_scan(scan_range=cfg.get(cfg.BIFI_SCAN_RANGE_SMALL))
+                self._matisse.thin_etalon_scan(scan_range=cfg.get(cfg.THIN_ETA_SCAN_RANGE_SMALL))
+                self._matisse.start_laser_lock_correction()
+            elif abs(drift) > tolerance:
+                if drift > 0:
+                    # measured wavelength is too high
+                    print(f"Wavelength too high, decreasing. Drift is {drift} nm. Refcell is at {self._matisse.query('SCAN:NOW?', numeric_result=True)}")
+                    if not self._matisse.is_any_limit_reached():
+                        if report_events:
+                            log_event(EventType.WAVELENGTH_DRIFT, self._matisse, current_wavelength,
+                                      f"wavelength drifted by {drift} nm")
+                        self._matisse.start_scan(matisse.SCAN_MODE_DOWN)
                     else:
-                        # measured wavelength is too low
-                        print(f"Wavelength too low, increasing.  Drift is {drift} nm. Refcell is at {self._matisse.query('SCAN:NOW?', numeric_result=True)}")
-                        if not self._matisse.is_any_limit_reached():
-                            if cfg.get(cfg.REPORT_EVENTS):
-                                log_event(EventType.WAVELENGTH_DRIFT, self._matisse, current_wavelength,
-                                          f"wavelength drifted by {drift} nm")
-                            self._matisse.start_scan(matisse.SCAN_MODE_UP)
-                        else:
-                            self.do_stabilization_correction(current_wavelength)
+                        self.do_stabilization_correction(current_wavelength)
                 else:
-                    self._matisse.stop_scan()
-                    # print(f"Within tolerance. Drift is {drift}")
-                time.sleep(cfg.get(cfg.STABILIZATION_DELAY))
+                    # measured wavelength is too low
+                    print(f"Wavelength too low, increasing.  Drift is {drift} nm. Refcell is at {self._matisse.query('SCAN:NOW?', numeric_result=True)}")
+                    if not self._matisse.is_any_limit_reached():
+                        if report_events:
+                            log_event(EventType.WAVELENGTH_DRIFT, self._matisse, current_wavelength,
+                                      f"wavelength drifted by {drift} nm")
+                        self._matisse.start_scan(matisse.SCAN_MODE_UP)
+                    else:
+                        self.do_stabilization_correction(current_wavelength)
             else:
                 self._matisse.stop_scan()
-                break
+                # print(f"Within tolerance. Drift is {drift}")
+            self.exit_event.wait(delay)
+        self._matisse.stop_scan()
 
     def do_stabilization_correction(self, wavelength):
         """Reset the stabilization piezos and optionally log the correction event."""
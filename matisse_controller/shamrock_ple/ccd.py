@@ -1,4 +1,4 @@
-import time
+import threading
 from ctypes import *
 
 import numpy as np
@@ -17,9 +17,11 @@ class CCD:
     MAX_TEMP = -10
 
     def __init__(self):
+        self._exit_event = threading.Event()
         try:
             self.lib = load_lib(CCD.LIBRARY_NAME)
             self.lib.Initialize()
+            self.lib.GetAcquiredData.argtypes = [POINTER(c_int32), c_int]
             self.lib.SetTemperature(c_int(cfg.get(cfg.PLE_TARGET_TEMPERATURE)))
             self.lib.CoolerON()
             self.temperature_ok = False
@@ -34,6 +36,18 @@ class CCD:
     def __del__(self):
         self.shutdown()
 
+    @property
+    def exit_flag(self) -> bool:
+        """Whether the current CCD operation has been asked to stop. Setting this interrupts any waits in progress."""
+        return self._exit_event.is_set()
+
+    @exit_flag.setter
+    def exit_flag(self, value: bool):
+        if value:
+            self._exit_event.set()
+        else:
+            self._exit_event.clear()
+
     def setup(self, exposure_time: float, acquisition_mode=ACQ_MODE_SINGLE, readout_mode=READ_MODE_FVB,
               temperature=-70, cool_down=True):
         """
@@ -63,13 +77,16 @@ class CCD:
             self.lib.CoolerON()
             # Cooler stops when temp is within 3 degrees of target, so wait until it's close
             # CCD normally takes a few minutes to fully cool down
+            tolerance = cfg.get(cfg.PLE_TEMPERATURE_TOLERANCE)
             while not self.temperature_ok:
                 if self.exit_flag:
                     return
                 current_temp = self.get_temperature()
                 print(f"Cooling CCD. Current temperature is {round(current_temp, 2)} °C")
-                self.temperature_ok = current_temp < temperature + cfg.get(cfg.PLE_TEMPERATURE_TOLERANCE)
-                time.sleep(10)
+                self.temperature_ok = current_temp < temperature + tolerance
+                if not self.temperature_ok:
+                    # Check back sooner the closer we are to the target, and stop waiting as soon as we're told to exit
+                    self._exit_event.wait(max(1.0, min(10.0, abs(current_temp - temperature) * 0.2)))
 
         print('Configuring acquisition parameters.')
         self.lib.SetAcquisitionMode(c_int(acquisition_mode))
@@ -99,26 +116,26 @@ class CCD:
 
         Returns
         -------
-        ndarray
-            an array of counts for each pixel on the CCD screen
+        ndarray or None
+            an array of counts for each pixel on the CCD screen, or None if the acquisition was aborted by setting
+            `exit_flag`
         """
-        self.exit_flag = False
+        # Don't clear the exit flag here - setup already does, and a stop requested since then should abort this too
         self.lib.StartAcquisition()
-        acquisition_array_type = c_int32 * num_points
-        data = acquisition_array_type()
         # self.lib.WaitForAcquisition() does not work, so use a loop instead and check the status.
         while True:
-            if self.exit_flag:
-                break
             status = c_int()
             self.lib.GetStatus(pointer(status))
             if status.value == CCDErrorCode.DRV_IDLE.value:
                 break
-            else:
-                time.sleep(1)
-        self.lib.GetAcquiredData(data, c_int(num_points))
-        data = np.flip(np.array(data, dtype=np.int32))  # Data comes out backwards!
-        return data
+            # Stop waiting as soon as we're told to exit, rather than at the end of the exposure
+            if self._exit_event.wait(1):
+                self.lib.AbortAcquisition()
+                return None
+        data = np.empty(num_points, dtype=np.int32)
+        # Let the SDK fill the NumPy array directly, rather than copying out of a ctypes array
+        self.lib.GetAcquiredData(data.ctypes.data_as(POINTER(c_int32)), c_int(num_points))
+        return np.flip(data)  # Data comes out backwards!
 
     def shutdown(self):
         """Run CCD-related cleanup and shutdown procedures."""
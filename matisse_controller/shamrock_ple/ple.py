@@ -1,7 +1,10 @@
+import json
 import os
 import pickle
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Pipe
+from pathlib import Path
 
 import numpy as np
 
@@ -13,6 +16,9 @@ from matisse_controller.shamrock_ple.shamrock import Shamrock
 ccd: CCD = None
 shamrock: Shamrock = None
 
+# Read and write PLE data files in large chunks, rather than Python's default of a few kilobytes at a time
+_DATA_FILE_BUFFER_SIZE = 1024 * 1024
+
 
 # TODO: Method to gracefully close all plots
 class PLE:
@@ -20,10 +26,22 @@ class PLE:
 
     def __init__(self, matisse):
         self.matisse = matisse
-        self.ple_exit_flag = False
+        self._exit_event = threading.Event()
         self.analysis_plot_processes = []
         self.spectrum_plot_processes = []
 
+    @property
+    def ple_exit_flag(self) -> bool:
+        """Whether running PLE tasks have been asked to stop. Setting this interrupts any waits in progress."""
+        return self._exit_event.is_set()
+
+    @ple_exit_flag.setter
+    def ple_exit_flag(self, value: bool):
+        if value:
+            self._exit_event.set()
+        else:
+            self._exit_event.clear()
+
     @staticmethod
     def load_andor_libs():
         """
@@ -55,8 +73,10 @@ class PLE:
         """
         Perform a PLE scan using the Andor Shamrock spectrometer and Newton CCD.
 
-        Generates text files with data from each spectrum taken during the scan, and pickles the Python dictionary of
-        all data into {scan_name}.pickle.
+        Generates text files with data from each spectrum taken during the scan, and saves all data as NumPy arrays:
+        the wavelength of each acquisition in {scan_name}_wavelengths.npy, and a 2-D array with one spectrum per row
+        in {scan_name}_spectra.npy. The spectrometer settings and the names of the array files are written to
+        {scan_name}.json, which is the file to open for analysis.
 
         Parameters
         ----------
@@ -85,7 +105,7 @@ class PLE:
         **ccd_kwargs
             kwargs to pass to `matisse_controller.shamrock_ple.ccd.CCD.setup`
         """
-        self.ple_exit_flag = False
+        self._exit_event.clear()
 
         if not scan_name:
             print('WARNING: Name of PLE scan is required.')
@@ -94,9 +114,13 @@ class PLE:
             print('WARNING: Location of PLE scan is required.')
             return
 
-        data_file_name = os.path.join(scan_location, f"{scan_name}.pickle")
+        scan_dir = Path(scan_location)
+        data_file_name = scan_dir / f"{scan_name}.json"
+        wavelengths_file_name = scan_dir / f"{scan_name}_wavelengths.npy"
+        spectra_file_name = scan_dir / f"{scan_name}_spectra.npy"
 
-        if os.path.exists(data_file_name):
+        # Scans used to be saved to a single .pickle file, so don't reuse those names either
+        if data_file_name.exists() or data_file_name.with_suffix('.pickle').exists():
             print(f"WARNING: A PLE scan has already been run for '{scan_name}'. Choose a new name and try again.")
             return
 
@@ -104,13 +128,24 @@ class PLE:
         print(f"Setting spectrometer grating to {grating_grooves} grvs and center wavelength to {center_wavelength}...")
         shamrock.set_grating_grooves(grating_grooves)
         shamrock.set_center_wavelength(center_wavelength)
-        if self.ple_exit_flag:
+        if self._exit_event.is_set():
             return
         ccd.setup(*ccd_args, **ccd_kwargs)
-        wavelengths = np.append(np.arange(initial_wavelength, final_wavelength, step), final_wavelength)
-        wavelength_range = abs(round(final_wavelength - initial_wavelength, cfg.get(cfg.WAVEMETER_PRECISION)))
+        precision = cfg.get(cfg.WAVEMETER_PRECISION)
+        # Keep the requested step between wavelengths, so the step in the file names is accurate. If the range isn't a
+        # whole number of steps, the last step is shorter. Round the quotient first so float error can't drop a step.
+        num_steps = int(np.floor(round(abs(final_wavelength - initial_wavelength) / step, 6)))
+        signed_step = step if final_wavelength >= initial_wavelength else -step
+        # Round every wavelength to what the wavemeter can resolve up front, as plain floats for use in file names
+        wavelengths = np.round(initial_wavelength + signed_step * np.arange(num_steps + 1), precision).tolist()
+        if wavelengths[-1] != round(final_wavelength, precision):
+            wavelengths.append(round(final_wavelength, precision))
+        tolerance = 10 ** -precision
+        wavelength_range = abs(round(final_wavelength - initial_wavelength, precision))
+        # Only the counter and wavelength change between spectrum file names, so build the rest of the name once
+        file_name_suffix = f"nm_StepSize_{step}nm_Range_{wavelength_range}nm.txt"
         counter = 1
-        file_name = ''
+        file_name = None
 
         pl_pipe_in, pl_pipe_out = Pipe()
         pl_plot_process = SpectrumPlotProcess(pipe=pl_pipe_out, daemon=True)
@@ -122,55 +157,91 @@ class PLE:
             analysis_plot_process = PLEAnalysisPlotProcess(pipe=analysis_pipe_out, daemon=True)
             self.analysis_plot_processes.append(analysis_plot_process)
             analysis_plot_process.start()
-
-        data = {
-            'grating_grooves': grating_grooves,
-            'center_wavelength': center_wavelength
-        }
-        for wavelength in wavelengths:
-            print(f"Starting acquisition {counter}/{len(wavelengths)}.")
-            wavelength = round(float(wavelength), cfg.get(cfg.WAVEMETER_PRECISION))
-            self.lock_at_wavelength(wavelength)
-            if self.ple_exit_flag:
-                print('Received exit signal, saving PLE data.')
-                break
-            acquisition_data = ccd.take_acquisition()  # FVB mode bins into each column, so this only grabs points along width
-            file_name = os.path.join(scan_location, f"{str(counter).zfill(3)}_{scan_name}_{wavelength}nm"
-                                                    f"_StepSize_{step}nm_Range_{wavelength_range}nm.txt")
-            np.savetxt(file_name, acquisition_data)
-
-            acq_wavelengths = self.pixels_to_wavelengths(range(len(acquisition_data)), center_wavelength, grating_grooves)
-            pl_pipe_in.send((acq_wavelengths, acquisition_data))
-
-            if plot_analysis:
-                start_pixel, end_pixel = self.find_integration_endpoints(integration_start, integration_end,
-                                                                         center_wavelength, grating_grooves)
-                analysis_pipe_in.send((wavelength, sum(acquisition_data[start_pixel:end_pixel])))
-
-            data[wavelength] = acquisition_data
-            counter += 1
+            # The integration region doesn't change during the scan, so only find its pixels once
+            start_pixel, end_pixel = self.find_integration_endpoints(integration_start, integration_end,
+                                                                     center_wavelength, grating_grooves)
+
+        # Spectra are stored in one contiguous array, one row per wavelength
+        measured_wavelengths = np.empty(len(wavelengths))
+        all_spectra = np.empty((len(wavelengths), CCD.WIDTH), dtype=np.int32)
+
+        # Write spectra to disk in the background while the laser locks to the next wavelength
+        save_futures = []
+        with ThreadPoolExecutor(max_workers=1) as io_pool:
+            for wavelength in wavelengths:
+                print(f"Starting acquisition {counter}/{len(wavelengths)}.")
+                self.lock_at_wavelength(wavelength, tolerance)
+                if self._exit_event.is_set():
+                    print('Received exit signal, saving PLE data.')
+                    break
+                acquisition_data = ccd.take_acquisition()  # FVB mode bins into each column, so this only grabs points along width
+                if acquisition_data is None:
+                    print('Received exit signal, discarding aborted acquisition and saving PLE data.')
+                    break
+                file_name = scan_dir / f"{str(counter).zfill(3)}_{scan_name}_{wavelength}{file_name_suffix}"
+                # Counts are integers, so don't spend time and space formatting them as 18-digit floats
+                save_futures.append(io_pool.submit(np.savetxt, file_name, acquisition_data, fmt='%d'))
+
+                acq_wavelengths = self.pixels_to_wavelengths(np.arange(len(acquisition_data)), center_wavelength,
+                                                             grating_grooves)
+                pl_pipe_in.send((acq_wavelengths, acquisition_data))
+
+                if plot_analysis:
+                    total = acquisition_data[start_pixel:end_pixel].sum(dtype=np.int64)
+                    analysis_pipe_in.send((wavelength, int(total)))
+
+                measured_wavelengths[counter - 1] = wavelength
+                all_spectra[counter - 1] = acquisition_data
+                counter += 1
+        for future in save_futures:
+            future.result()  # raise any errors from writing the spectra
 
         pl_pipe_in.send(None)
-        if file_name:
+        if file_name is not None:
             self.plot_single_acquisition(center_wavelength, grating_grooves, data_file=file_name)
 
-        with open(data_file_name, 'wb') as data_file:
-            pickle.dump(data, data_file, pickle.HIGHEST_PROTOCOL)
+        # Arrays are saved in NumPy's own format so they can be memory-mapped when loading, rather than unpickled. The
+        # metadata is written last, so it only exists if the arrays were saved successfully.
+        np.save(wavelengths_file_name, measured_wavelengths[:counter - 1])
+        np.save(spectra_file_name, all_spectra[:counter - 1])
+        meta = {
+            'meta': {
+                'grating_grooves': int(grating_grooves),
+                'center_wavelength': float(center_wavelength)
+            },
+            'wavelengths_file': wavelengths_file_name.name,
+            'spectra_file': spectra_file_name.name
+        }
+        with open(data_file_name, 'w') as data_file:
+            json.dump(meta, data_file, indent=4)
         print('Finished PLE scan.')
 
-    def lock_at_wavelength(self, wavelength: float):
-        """Try to lock the Matisse at a given wavelength, waiting to return until we're within a small tolerance."""
-        tolerance = 10 ** -cfg.get(cfg.WAVEMETER_PRECISION)
+    def lock_at_wavelength(self, wavelength: float, tolerance: float = None):
+        """
+        Try to lock the Matisse at a given wavelength, waiting to return until we're within a small tolerance.
+
+        Parameters
+        ----------
+        wavelength
+            the wavelength at which to lock the Matisse
+        tolerance
+            the maximum allowed difference from the given wavelength, by default the smallest difference the wavemeter
+            can measure
+        """
+        if tolerance is None:
+            tolerance = 10 ** -cfg.get(cfg.WAVEMETER_PRECISION)
         self.matisse.set_wavelength(wavelength)
-        while abs(wavelength - self.matisse.wavemeter_wavelength()) >= tolerance or \
-                (self.matisse.is_setting_wavelength or self.matisse.is_scanning_bifi or self.matisse.is_scanning_thin_etalon):
-            if self.ple_exit_flag:
+        # Check often at first, in case the laser settles quickly, then back off to avoid hammering the wavemeter
+        delay = 0.1
+        # The Matisse keeps track of its own tuning, so check that before reading the wavemeter
+        while self.matisse.is_tuning() or abs(wavelength - self.matisse.wavemeter_wavelength()) >= tolerance:
+            if self._exit_event.wait(delay):
                 break
-            time.sleep(3)
+            delay = min(delay * 2, 3)
 
     def stop_ple_tasks(self):
         """Trigger the exit flags to stop running scans and PLE measurements."""
-        self.ple_exit_flag = True
+        self._exit_event.set()
         if ccd:
             ccd.exit_flag = True
 
@@ -179,13 +250,14 @@ class PLE:
         """
         Sum the counts of all spectra for a set of PLE measurements and plot them against wavelength.
 
-        Loads PLE data from a .pickle file and pickles integrated counts for each wavelength into another .pickle file.
-        Optionally subtract background from given file name. The background file should be loadable with numpy.loadtxt.
+        Loads PLE data from the .json file of a scan (or a .pickle file from older scans) and pickles integrated counts
+        for each wavelength into a .pickle file. Optionally subtract background from given file name. The background
+        file should be loadable with numpy.loadtxt.
 
         Parameters
         ----------
         data_file_path
-            the path to the .pickle file containing the PLE measurement data
+            the path to the .json or .pickle file containing the PLE measurement data
         integration_start
             start of integration region (nm) for tallying the counts
         integration_end
@@ -193,7 +265,7 @@ class PLE:
         background_file_path
             the name of a file to use for subtracting background, should be loadable with numpy.loadtxt
         """
-        self.ple_exit_flag = False
+        self._exit_event.clear()
 
         if not data_file_path:
             print('WARNING: No data file provided to analyze.')
@@ -209,38 +281,86 @@ class PLE:
             print(f"WARNING: An analysis called '{analysis_name}' already exists. Choose a new name and try again.")
             return
 
-        with open(data_file_path, 'rb') as full_data_file:
-            scans = pickle.load(full_data_file)
+        scans = self._load_ple_data(data_file_path)
 
         if background_file_path:
             background_data = np.loadtxt(background_file_path)
         else:
             background_data = None
 
-        center_wavelength = scans.pop('center_wavelength')
-        grating_grooves = scans.pop('grating_grooves')
+        center_wavelength = scans['meta']['center_wavelength']
+        grating_grooves = scans['meta']['grating_grooves']
         start_pixel, end_pixel = self.find_integration_endpoints(integration_start, integration_end,
                                                                  center_wavelength, grating_grooves)
-        total_counts = {}
-        for wavelength in scans.keys():
-            if self.ple_exit_flag:
-                print('Received exit signal, saving PLE data.')
-                break
-            if background_data and background_data.any():
-                scans[wavelength] = scans[wavelength].astype(np.double)
-                scans[wavelength] -= background_data
-            total_counts[wavelength] = sum(scans[wavelength][start_pixel:end_pixel])
+        if len(scans['wavelengths']) == 0:
+            print('WARNING: No spectra found in data file.')
+            return
+
+        # Integrate every spectrum at once, with one row per wavelength. Only the integration region is read, and since
+        # the background is the same for every spectrum, its integral is subtracted from each total instead of from
+        # every pixel of every spectrum.
+        all_spectra = scans['spectra']
+        totals = all_spectra[:, start_pixel:end_pixel].sum(axis=1, dtype=np.float64)
+        if background_data is not None:
+            if background_data.shape != all_spectra.shape[1:]:
+                print(f"WARNING: Background file has {background_data.size} points, but each spectrum has "
+                      f"{all_spectra.shape[1]}. Choose a matching background file and try again.")
+                return
+            totals -= background_data[start_pixel:end_pixel].sum()
+        total_counts = dict(zip(scans['wavelengths'].tolist(), totals.tolist()))
 
-        with open(analysis_file_path, 'wb') as analysis_file:
+        with open(analysis_file_path, 'wb', buffering=_DATA_FILE_BUFFER_SIZE) as analysis_file:
             pickle.dump(total_counts, analysis_file, pickle.HIGHEST_PROTOCOL)
 
         plot_process = PLEAnalysisPlotProcess(total_counts, daemon=True)
         self.analysis_plot_processes.append(plot_process)
         plot_process.start()
 
+    @staticmethod
+    def _load_ple_data(data_file_path: str) -> dict:
+        """
+        Load PLE measurement data from the .json file of a scan, or from a .pickle file saved by older versions,
+        converting data saved in older layouts to the current one.
+
+        Arrays saved alongside a .json file are memory-mapped read-only, so only the parts that are used are read from
+        disk.
+
+        Returns
+        -------
+        dict
+            the spectrometer settings under 'meta', an array of wavelengths under 'wavelengths', and a 2-D array under
+            'spectra' with the spectrum for each of those wavelengths in the corresponding row
+        """
+        data_file_path = Path(data_file_path)
+        if data_file_path.suffix == '.json':
+            with open(data_file_path) as data_file:
+                meta = json.load(data_file)
+            data_dir = data_file_path.parent
+            return {
+                'meta': meta['meta'],
+                'wavelengths': np.load(data_dir / meta['wavelengths_file']),
+                'spectra': np.load(data_dir / meta['spectra_file'], mmap_mode='r')
+            }
+
+        with open(data_file_path, 'rb', buffering=_DATA_FILE_BUFFER_SIZE) as data_file:
+            data = pickle.load(data_file)
+
+        if 'meta' not in data:
+            # Oldest layout: metadata alongside spectra keyed by wavelength
+            data = {
+                'meta': {key: data.pop(key) for key in ('center_wavelength', 'grating_grooves')},
+                'spectra': data
+            }
+        if isinstance(data['spectra'], dict):
+            # Spectra keyed by wavelength
+            spectra = data['spectra']
+            data['wavelengths'] = np.array(list(spectra.keys()), dtype=np.float64)
+            data['spectra'] = np.stack(list(spectra.values())) if spectra else np.empty((0, CCD.WIDTH))
+        return data
+
     def plot_ple_analysis_file(self, analysis_file_path: str):
         """Plot the PLE analysis data from the given .pickle file."""
-        with open(analysis_file_path, 'rb') as analysis_file:
+        with open(analysis_file_path, 'rb', buffering=_DATA_FILE_BUFFER_SIZE) as analysis_file:
             data = pickle.load(analysis_file)
         plot_process = PLEAnalysisPlotProcess(data, daemon=True)
         self.analysis_plot_processes.append(plot_process)
@@ -266,7 +386,7 @@ class PLE:
         **ccd_kwargs
             kwargs to pass to `matisse_controller.shamrock_ple.ccd.CCD.setup`
         """
-        self.ple_exit_flag = False
+        self._exit_event.clear()
         if data_file:
             data = np.loadtxt(data_file)
         else:
@@ -274,12 +394,14 @@ class PLE:
             print(f"Setting spectrometer grating to {grating_grooves} grvs and center wavelength to {center_wavelength}...")
             shamrock.set_grating_grooves(grating_grooves)
             shamrock.set_center_wavelength(center_wavelength)
-            if self.ple_exit_flag:
+            if self._exit_event.is_set():
                 return
             ccd.setup(*ccd_args, **ccd_kwargs)
             data = ccd.take_acquisition()
+            if data is None:
+                return
 
-        wavelengths = self.pixels_to_wavelengths(range(len(data)), center_wavelength, grating_grooves)
+        wavelengths = self.pixels_to_wavelengths(np.arange(len(data)), center_wavelength, grating_grooves)
 
         plot_process = SpectrumPlotProcess(wavelengths, data, daemon=True)
         self.spectrum_plot_processes.append(plot_process)
@@ -292,7 +414,7 @@ class PLE:
         Parameters
         ----------
         pixels
-            an iterable of pixel indices to be converted to wavelengths
+            an array of pixel indices to be converted to wavelengths
         center_wavelength
             the center wavelength used to take the CCD data
         grating_grooves
@@ -307,20 +429,23 @@ class PLE:
         offset = Shamrock.GRATINGS_OFFSET_NM[grating_grooves]
         # Point-slope formula for calculating wavelengths from pixels
         # Use pixel + 1 because indexes range from 0 to 1023, CCD center is at 512 but zero-indexing would put it at 511
-        wavelengths = [nm_per_pixel * (pixel + 1 - CCD.WIDTH / 2) + center_wavelength + offset for pixel in pixels]
-        return np.array(wavelengths)
+        return nm_per_pixel * (np.asarray(pixels) + 1 - CCD.WIDTH / 2) + center_wavelength + offset
 
     def find_integration_endpoints(self, start_wavelength: float, end_wavelength: float, center_wavelength: float,
                                    grating_grooves: int):
         """
-        Convert a starting and ending wavelength to CCD pixels.
+        Convert a starting and ending wavelength to CCD pixels. Arrays of starting and ending wavelengths may be given
+        to find the endpoints of several integration regions at once.
+
+        Pixels are clipped to the edges of the CCD, so integration regions extending past the CCD are cut short rather
+        than wrapping around to the other end.
 
         Parameters
         ----------
         start_wavelength
-            starting point of integration, in nanometers
+            starting point(s) of integration, in nanometers
         end_wavelength
-            ending point of integration, in nanometers
+            ending point(s) of integration, in nanometers
         center_wavelength
             the wavelength at which the spectrometer was set
         grating_grooves
@@ -328,12 +453,18 @@ class PLE:
 
         Returns
         -------
-        (int, int)
+        (int, int) or (ndarray, ndarray)
             the start and end pixels corresponding to the given start and end wavelengths
         """
         nm_per_pixel = Shamrock.GRATINGS_NM_PER_PIXEL[grating_grooves]
         offset = Shamrock.GRATINGS_OFFSET_NM[grating_grooves]
         # Invert pixel -> wavelength conversion
-        start_pixel = int(CCD.WIDTH / 2 - 1 + (start_wavelength - center_wavelength - offset) / nm_per_pixel)
-        end_pixel = int(CCD.WIDTH / 2 - 1 + (end_wavelength - center_wavelength - offset) / nm_per_pixel)
+        start_pixel = np.floor(CCD.WIDTH / 2 - 1 + (np.asarray(start_wavelength) - center_wavelength - offset)
+                               / nm_per_pixel)
+        end_pixel = np.floor(CCD.WIDTH / 2 - 1 + (np.asarray(end_wavelength) - center_wavelength - offset)
+                             / nm_per_pixel)
+        start_pixel = np.clip(start_pixel, 0, CCD.WIDTH).astype(np.intp)
+        end_pixel = np.clip(end_pixel, 0, CCD.WIDTH).astype(np.intp)
+        if start_pixel.ndim == 0 and end_pixel.ndim == 0:
+            return int(start_pixel), int(end_pixel)
         return start_pixel, end_pixel
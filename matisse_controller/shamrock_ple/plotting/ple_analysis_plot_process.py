@@ -4,6 +4,7 @@ import multiprocessing
 from multiprocessing.connection import Connection
 
 import matplotlib.pyplot as plt
+import numpy as np
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
 
@@ -12,8 +13,9 @@ class PLEAnalysisPlotProcess(multiprocessing.Process):
     def __init__(self, analysis_data=None, pipe: Connection = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if analysis_data:
-            self.wavelengths = list(analysis_data.keys())
-            self.counts = list(analysis_data.values())
+            # Arrays are pickled as a single buffer when the process starts, rather than one object per point
+            self.wavelengths = np.fromiter(analysis_data.keys(), dtype=float, count=len(analysis_data))
+            self.counts = np.fromiter(analysis_data.values(), dtype=float, count=len(analysis_data))
         else:
             self.wavelengths = []
             self.counts = []
@@ -12,6 +12,9 @@ def take_background(number):
 
     for i in range(number):
         data = ple.ccd.take_acquisition()
+        if data is None:
+            print('Acquisition aborted, not saving any more background files.')
+            return
         np.savetxt(f"{str(i + 1).zfill(3)}_background_0.1s.txt.gz", data)
 
 
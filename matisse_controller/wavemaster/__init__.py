@@ -1 +1,2 @@
 from .wavemaster import WaveMaster
+from .polling_thread import WaveMasterPollingThread
@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class WaveMasterPollingThread(threading.Thread):
+    """
+    A thread that continuously reads the wavelength from a WaveMaster, so that a recent measurement is usually available
+    without waiting on the serial port.
+    """
+
+    def __init__(self, wavemaster, interval: float, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        wavemaster : matisse_controller.wavemaster.wavemaster.WaveMaster
+        interval : float
+            the number of seconds to wait between measurements
+        *args
+            args to pass to `Thread.__init__`
+        **kwargs
+            kwargs to pass to `Thread.__init__`
+        """
+        super().__init__(*args, **kwargs)
+        self._wavemaster = wavemaster
+        self.interval = interval
+        self.exit_event = threading.Event()
+        # Notified whenever a measurement succeeds or fails
+        self._new_reading = threading.Condition()
+        self._latest_wavelength = None
+        self._latest_time = None
+        self._latest_error = None
+        self._latest_error_time = None
+
+    def run(self):
+        """Measure the wavelength every `interval` seconds until `exit_event` is set."""
+        while not self.exit_event.is_set():
+            # Time each measurement from when it was requested, so it's never mistaken for one taken after a later event
+            started = time.monotonic()
+            try:
+                wavelength = self._wavemaster.get_wavelength()
+            except Exception as err:
+                # Keep polling, so a single bad reading doesn't leave everyone with the last good one forever
+                with self._new_reading:
+                    self._latest_error = err
+                    self._latest_error_time = started
+                    self._new_reading.notify_all()
+            else:
+                with self._new_reading:
+                    self._latest_wavelength = wavelength
+                    self._latest_time = started
+                    self._latest_error = None
+                    self._new_reading.notify_all()
+            self.exit_event.wait(self.interval)
+
+    def get_wavelength(self, max_age: float, newer_than: float = None) -> float:
+        """
+        Parameters
+        ----------
+        max_age : float
+            the age, in seconds, past which a measurement is too old to return. If the most recent measurement is older
+            than this, such as while the wavemeter shows no signal, wait for a new one.
+        newer_than : float
+            if given, a `time.monotonic()` timestamp that the measurement must have started after - for example, the
+            time at which a motor finished moving. Wait for such a measurement if there isn't one yet.
+
+        Returns
+        -------
+        float
+            the most recent measurement from the wavemeter, taken no more than `max_age` seconds ago
+
+        Raises
+        ------
+        IOError
+            if the most recent attempt to measure the wavelength failed, or if the polling thread has stopped
+        """
+        with self._new_reading:
+            while True:
+                if self._latest_error is not None and (newer_than is None or self._latest_error_time > newer_than):
+                    raise IOError('Most recent wavemeter measurement failed.') from self._latest_error
+                if self._latest_time is not None and time.monotonic() - self._latest_time <= max_age and \
+                        (newer_than is None or self._latest_time > newer_than):
+                    return self._latest_wavelength
+                if not self.is_alive():
+                    raise IOError('Wavemeter polling thread is not running.')
+                # Check back periodically in case the thread stops without taking another measurement
+                self._new_reading.wait(max_age)
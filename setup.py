@@ -35,7 +35,7 @@ setup(name='matisse-controller',
           '': ['*/*.md'],
       },
       include_package_data=True,
-      install_requires=['pyvisa >=1, <2', 'pyserial >=3, <4', 'scipy >=1, <2', 'matplotlib >=3, <4', 'pyqt5 >=5',
+      install_requires=['pyvisa >=1, <2', 'pyserial >=3, <4', 'scipy >=1.1, <2', 'matplotlib >=3, <4', 'pyqt5 >=5',
                         'bidict >=0.18', 'glom >= 19.2'],
       # TODO: Test other python versions
       python_requires='~=3.7',